@@ -1,22 +1,26 @@
 # backend/api/historical_data.py
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from backend.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.crud import minute_bucket
 from backend.models import OHLCV1m
-from backend.schemas import OHLCVSchema
 from pydantic import BaseModel
 from datetime import datetime, timedelta
-from backend.database import SessionLocal
+from backend.database import get_db
 import pandas as pd
-from backend.models import TickData
-from fastapi import HTTPException
+from backend.models import TickData, Symbol
+from fastapi import HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from redis.exceptions import RedisError
+from backend.core.redis_pool import get_redis
+import orjson
+import os, time, logging
 
 router = APIRouter(prefix="/api/v1/data", tags=["Data"])
+logger = logging.getLogger("historical")
 
-@router.get("/history/{symbol}/{timeframe}", response_model=list[OHLCVSchema])
-def get_history(symbol: str, timeframe: str, db: Session = Depends(get_db)):
-    return db.query(OHLCV1m).filter(OHLCV1m.symbol == symbol).all()
-
+HISTORY_CACHE_TTL = int(os.getenv("HISTORY_CACHE_TTL", 30))  # seconds
+TICK_BATCH_ROWS = 10_000
 
 # ---------------------------------------------------------------------
 # Response Schemas
@@ -32,94 +36,148 @@ class OHLCVResponse(BaseModel):
 # ---------------------------------------------------------------------
 # Utility: Query Raw Tick Data
 # ---------------------------------------------------------------------
-def query_ticks(session: Session, symbol: str, since: datetime):
-    """Fetch tick data newer than `since` for a given symbol."""
-    q = (
-        session.query(TickData)
-        .filter(TickData.symbol == symbol.lower(), TickData.ts >= since)
+def query_ticks(symbol: str, since: datetime):
+    """Build a Core select for tick data newer than `since` for a given symbol.
+    Rows are streamed from a server-side cursor in TICK_BATCH_ROWS batches."""
+    return (
+        select(TickData.ts, TickData.price, TickData.size)
+        .join(Symbol, Symbol.id == TickData.symbol_id)
+        .where(Symbol.name == symbol.lower(), TickData.ts >= since)
         .order_by(TickData.ts)
+        .execution_options(yield_per=TICK_BATCH_ROWS)
     )
-    return q.all()
+
+# ---------------------------------------------------------------------
+# Utility: Encode OHLCV Frames
+# ---------------------------------------------------------------------
+def _records_json(df: pd.DataFrame) -> bytes:
+    """Encode an OHLCV frame as a JSON array of records in a single orjson call."""
+    if df.empty:
+        return b"[]"
+    out = df.copy(deep=False)
+    out["ts"] = out["ts"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+    return orjson.dumps(out.to_dict(orient="records"), option=orjson.OPT_SERIALIZE_NUMPY)
+
+# ---------------------------------------------------------------------
+# Utility: Short-TTL Redis Cache for History Responses
+# ---------------------------------------------------------------------
+def _history_key(*parts) -> str:
+    """Redis key for a history response, scoped to the current TTL window."""
+    window = int(time.time()) // HISTORY_CACHE_TTL
+    return ":".join(["history", *map(str, parts), str(window)])
+
+async def _cache_get(key: str):
+    """Return the cached JSON body for `key`, or None (cache errors are non-fatal)."""
+    try:
+        return await get_redis().get(key)
+    except RedisError as e:
+        logger.warning(f"History cache read failed ({key}): {e}")
+        return None
+
+async def _cache_set(key: str, body: bytes):
+    """Store an encoded JSON body under `key` with HISTORY_CACHE_TTL expiry."""
+    try:
+        await get_redis().setex(key, HISTORY_CACHE_TTL, body)
+    except RedisError as e:
+        logger.warning(f"History cache write failed ({key}): {e}")
 
 # ---------------------------------------------------------------------
 # REST Endpoint: Dynamic Resampling from TickData
 # ---------------------------------------------------------------------
-@router.get("/history/{symbol}/{timeframe}", response_model=list[OHLCVResponse])
-def get_history(symbol: str, timeframe: str = "1m", minutes: int = 60):
+# Bodies are pre-encoded with orjson; `responses` documents the schema without re-validating it
+@router.get("/history/{symbol}/{timeframe}", responses={200: {"model": list[OHLCVResponse]}})
+async def get_history(
+    symbol: str, timeframe: str = "1m", minutes: int = 60, db: AsyncSession = Depends(get_db)
+):
     """
     Returns OHLCV data built dynamically from tick data.
+    Responses are cached in Redis for HISTORY_CACHE_TTL seconds.
 
     Args:
         symbol: trading pair symbol (e.g., btcusdt)
         timeframe: '1s', '1m', or '5m'
         minutes: how many minutes of history to include
     """
-    tf_map = {"1s": "S", "1m": "T", "5m": "5T"}
+    tf_map = {"1s": "s", "1m": "min", "5m": "5min"}
     if timeframe not in tf_map:
         raise HTTPException(status_code=400, detail="Invalid timeframe (must be 1s, 1m, or 5m)")
-    freq = tf_map[timeframe]
 
-    session = SessionLocal()
-    try:
-        since = datetime.utcnow() - timedelta(minutes=minutes)
-        rows = query_ticks(session, symbol, since)
-        if not rows:
-            return []
-
-        # Build DataFrame from tick data
-        df = pd.DataFrame([{"ts": r.ts, "price": r.price, "size": r.size} for r in rows])
-        df = df.set_index(pd.DatetimeIndex(df["ts"]))
-
-        # Resample to OHLCV
-        ohlc = df["price"].resample(freq).ohlc()
-        vol = df["size"].resample(freq).sum().rename("volume")
-        merged = ohlc.join(vol)
-        merged = merged.dropna(subset=["open"])
-
-        # Convert to list of dicts
-        out = []
-        for idx, row in merged.iterrows():
-            out.append({
-                "ts": idx.isoformat(),
-                "open": float(row["open"]),
-                "high": float(row["high"]),
-                "low": float(row["low"]),
-                "close": float(row["close"]),
-                "volume": float(row["volume"] if not pd.isna(row["volume"]) else 0.0)
-            })
-        return out
-    finally:
-        session.close()
+    key = _history_key(symbol.lower(), timeframe, minutes)
+    body = await _cache_get(key)
+    if not body:
+        body = await _resample_ticks(db, symbol, tf_map[timeframe], minutes)
+        await _cache_set(key, body)
+    return Response(body, media_type="application/json")
+
+async def _resample_ticks(db: AsyncSession, symbol: str, freq: str, minutes: int):
+    """Resample the last `minutes` of ticks into OHLCV candles at `freq` (JSON bytes)."""
+    since = datetime.utcnow() - timedelta(minutes=minutes)
+
+    def _load(session):
+        # Load ticks straight into typed columns (no ORM hydration), one streamed
+        # batch at a time so raw row tuples never pile up for the whole window
+        batches = pd.read_sql_query(
+            query_ticks(symbol, since),
+            session.connection(),
+            index_col="ts",
+            parse_dates=["ts"],
+            dtype={"price": "float64", "size": "float64"},
+            chunksize=TICK_BATCH_ROWS,
+        )
+        return pd.concat(batches)
+
+    df = await db.run_sync(_load)
+    if df.empty:
+        return b"[]"
+    # resampling is CPU-bound: keep it off the event loop
+    return await run_in_threadpool(_ohlcv_json, df, freq)
+
+def _ohlcv_json(df: pd.DataFrame, freq: str) -> bytes:
+    """Resample a tick frame (ts index, price, size) to OHLCV and encode it."""
+    # one resampler (bins computed once), volume added as a column instead of a join
+    resampler = df.resample(freq)
+    merged = resampler["price"].ohlc()
+    merged["volume"] = resampler["size"].sum()
+    merged = merged.dropna(subset=["open"])
+    merged["volume"] = merged["volume"].fillna(0.0)
+    return _records_json(merged.reset_index())
 
 # ---------------------------------------------------------------------
 # REST Endpoint: Read from Precomputed OHLCV_1m Table (if needed)
 # ---------------------------------------------------------------------
-@router.get("/history_cached/{symbol}", response_model=list[OHLCVResponse])
-def get_cached_history(symbol: str, minutes: int = 60):
+@router.get("/history_cached/{symbol}", responses={200: {"model": list[OHLCVResponse]}})
+async def get_cached_history(symbol: str, minutes: int = 60, db: AsyncSession = Depends(get_db)):
     """
     Fetch OHLCV data directly from `ohlcv_1m` table for faster response.
+    Responses are cached in Redis for HISTORY_CACHE_TTL seconds.
     """
-    session = SessionLocal()
-    try:
-        cutoff = datetime.utcnow() - timedelta(minutes=minutes)
-        rows = (
-            session.query(OHLCV1m)
-            .filter(OHLCV1m.symbol == symbol.lower(), OHLCV1m.ts >= cutoff)
-            .order_by(OHLCV1m.ts)
-            .all()
+    key = _history_key("cached", symbol.lower(), minutes)
+    body = await _cache_get(key)
+    if not body:
+        body = await _load_ohlcv_1m(db, symbol, minutes)
+        await _cache_set(key, body)
+    return Response(body, media_type="application/json")
+
+async def _load_ohlcv_1m(db: AsyncSession, symbol: str, minutes: int):
+    """Read the last `minutes` of stored 1m candles (JSON bytes)."""
+    cutoff = datetime.utcnow() - timedelta(minutes=minutes)
+    stmt = (
+        select(
+            OHLCV1m.ts,
+            OHLCV1m.open,
+            OHLCV1m.high,
+            OHLCV1m.low,
+            OHLCV1m.close,
+            OHLCV1m.volume,
         )
-        if not rows:
-            return []
-        return [
-            {
-                "ts": r.ts.isoformat(),
-                "open": r.open,
-                "high": r.high,
-                "low": r.low,
-                "close": r.close,
-                "volume": r.volume,
-            }
-            for r in rows
-        ]
-    finally:
-        session.close()
+        .where(
+            OHLCV1m.symbol == symbol.lower(),
+            OHLCV1m.ts_bucket >= minute_bucket(cutoff),
+            OHLCV1m.ts >= cutoff,
+        )
+        .order_by(OHLCV1m.ts)
+    )
+    df = await db.run_sync(
+        lambda session: pd.read_sql_query(stmt, session.connection(), parse_dates=["ts"])
+    )
+    return _records_json(df)
@@ -1,17 +1,10 @@
 # backend/api/real_time.py
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
-from redis import asyncio as aioredis
-from dotenv import load_dotenv
 from starlette.websockets import WebSocketState
-import os, json, asyncio, logging
-
-# ---------------------------------------------------------------------
-# Environment Configuration
-# ---------------------------------------------------------------------
-load_dotenv()
-REDIS_HOST = os.getenv("REDIS_HOST", "127.0.0.1")
-REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
-REDIS_DB = int(os.getenv("REDIS_DB", 0))
+from backend.core.redis_pool import get_redis, get_pubsub_redis
+from redis.exceptions import RedisError
+import json, asyncio, logging
+import orjson
 
 router = APIRouter()
 logger = logging.getLogger("realtime")
@@ -26,12 +19,12 @@ async def get_cached_analytics(pair: str):
     Retrieve the most recent cached analytics for a trading pair.
     Value expected in Redis key: live:{pair}
     """
-    r = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
     key = f"live:{pair}"
     try:
-        val = await r.get(key)
-    finally:
-        await r.close()
+        val = await get_redis().get(key)
+    except RedisError as e:
+        logger.warning(f"Analytics cache read failed ({key}): {e}")
+        raise HTTPException(status_code=503, detail="Analytics cache unavailable")
 
     if not val:
         raise HTTPException(status_code=404, detail=f"No analytics cached yet for {pair}")
@@ -40,6 +33,46 @@ async def get_cached_analytics(pair: str):
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Corrupted analytics JSON in cache")
 
+# ---------------------------------------------------------------------
+# REST Endpoint: Fetch Cached Analytics for Many Pairs (one MGET)
+# ---------------------------------------------------------------------
+@router.get("/api/v1/analytics")
+async def get_cached_analytics_batch(pairs: str):
+    """
+    Retrieve cached analytics for several pairs in a single Redis round-trip.
+    `pairs` is comma-separated (e.g. ?pairs=btcusdt,ethusdt); pairs with
+    nothing cached yet map to null.
+    """
+    names = list(dict.fromkeys(p.strip() for p in pairs.split(",") if p.strip()))
+    if not names:
+        raise HTTPException(status_code=400, detail="No pairs given")
+
+    try:
+        vals = await get_redis().mget([f"live:{p}" for p in names])
+    except RedisError as e:
+        logger.warning(f"Analytics cache read failed ({len(names)} pairs): {e}")
+        raise HTTPException(status_code=503, detail="Analytics cache unavailable")
+    try:
+        return {p: orjson.loads(v) if v else None for p, v in zip(names, vals)}
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=500, detail="Corrupted analytics JSON in cache")
+
+# ---------------------------------------------------------------------
+# WebSocket Helpers
+# ---------------------------------------------------------------------
+async def _forward(pubsub, ws: WebSocket):
+    """Relay pubsub messages to the client as soon as they arrive."""
+    async for msg in pubsub.listen():
+        if msg.get("type") == "message":
+            await ws.send_text(msg["data"])
+
+async def _watch_client(ws: WebSocket):
+    """Consume inbound frames until the client closes the connection."""
+    while True:
+        msg = await ws.receive()
+        if msg["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(code=msg.get("code", 1000))
+
 # ---------------------------------------------------------------------
 # WebSocket Endpoint: Live Analytics Stream
 # ---------------------------------------------------------------------
@@ -50,52 +83,44 @@ async def websocket_live(ws: WebSocket, pair: str):
     subscribes to Redis channel: live_updates:{pair}.
     """
     origin = ws.headers.get("origin")
-    print(f"Incoming WebSocket connection from: {origin}")
+    logger.debug("Incoming WebSocket connection from: %s", origin)
 
     # ✅ Accept connection from Streamlit or localhost origins
     allowed_origins = {"http://localhost:8501", "http://127.0.0.1:8501"}
     if origin not in allowed_origins:
         # For development, you can temporarily allow all:
         # await ws.accept()
-        print(f"⚠️ Origin {origin} not explicitly allowed — accepting anyway for dev.")
+        logger.debug("Origin %s not explicitly allowed — accepting anyway for dev.", origin)
     await ws.accept()
 
-    r = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
-    pubsub = r.pubsub()
+    pubsub = get_pubsub_redis().pubsub()
     channel = f"live_updates:{pair}"
-    await pubsub.subscribe(channel)
-    logger.info(f"🔌 WebSocket connected for {pair}, subscribed to Redis channel: {channel}")
-
+    tasks = ()
     try:
-        while True:
-            msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            if msg and msg.get("type") == "message":
-                data = msg["data"]
-                try:
-                    await ws.send_text(data)
-                except Exception:
-                    logger.warning(f"⚠️ Client disconnected while sending update for {pair}")
-                    break
+        await pubsub.subscribe(channel)
+        logger.info(f"🔌 WebSocket connected for {pair}, subscribed to Redis channel: {channel}")
 
-            # keep-alive ping
-            try:
-                await asyncio.wait_for(ws.receive_text(), timeout=0.1)
-            except asyncio.TimeoutError:
-                continue
-            except Exception:
-                pass
+        # Event-driven: one task relays Redis messages, one watches for client close
+        send_task = asyncio.create_task(_forward(pubsub, ws))
+        recv_task = asyncio.create_task(_watch_client(ws))
+        tasks = (send_task, recv_task)
+        done, _ = await asyncio.wait({send_task, recv_task}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()  # re-raise whatever ended the session
 
     except WebSocketDisconnect:
         logger.info(f"❌ WebSocket disconnected for {pair}")
     except Exception as e:
         logger.error(f"WebSocket error ({pair}): {e}")
         if ws.application_state == WebSocketState.CONNECTED:
-            await ws.close()
+            await ws.close(code=1011)
     finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         try:
             await pubsub.unsubscribe(channel)
             await pubsub.close()
-            await r.close()
         except Exception:
             pass
         logger.info(f"🔒 Cleaned up Redis pubsub for {pair}")
@@ -1,58 +1,205 @@
 # backend/core/analytics.py
 import numpy as np
 import pandas as pd
-from statsmodels.regression.linear_model import OLS
+from numba import njit
 from statsmodels.tsa.stattools import adfuller
 
+@njit(cache=True, fastmath=True)
+def _ols_beta(x, y):
+    """Slope of y ~ beta*x + c over complete samples, via centred moments."""
+    n = len(x)
+    if n < 2:
+        return np.nan
+    mx = x.mean()
+    my = y.mean()
+    sxx = 0.0
+    sxy = 0.0
+    for i in range(n):
+        dx = x[i] - mx
+        sxx += dx * dx
+        sxy += dx * (y[i] - my)
+    if sxx <= 0.0:
+        return np.nan
+    return sxy / sxx
+
 def hedge_ratio_ols(y: pd.Series, x: pd.Series):
     """OLS hedge ratio (beta) for y ~ beta*x + c"""
     df = pd.concat([x, y], axis=1).dropna()
-    if len(df) < 2:
-        return np.nan
-    X = df.iloc[:, 0].values
-    Y = df.iloc[:, 1].values
-    Xmat = np.vstack([X, np.ones(len(X))]).T
-    model = OLS(Y, Xmat).fit()
-    beta = model.params[0]
-    return float(beta)
+    return hedge_ratio_array(
+        df.iloc[:, 1].to_numpy(dtype=np.float64),
+        df.iloc[:, 0].to_numpy(dtype=np.float64),
+    )
 
 def compute_spread(y: pd.Series, x: pd.Series, hedge_ratio: float):
     return y - hedge_ratio * x
 
+# fastmath without the no-NaN assumption, so NaN windows are still detected
+_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _rolling_pair(x, y, w, corr):
+    """
+    Rolling OLS slope of y on x (corr=False) or Pearson correlation
+    (corr=True), maintained with sliding window sums of x, y, xy, x², y²
+    in a single pass. Windows containing a NaN in either input give NaN.
+    """
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n < w:
+        return out
+    # shift by the first complete sample so the running sums stay well conditioned
+    kx = 0.0
+    ky = 0.0
+    for i in range(n):
+        if not (np.isnan(x[i]) or np.isnan(y[i])):
+            kx = x[i]
+            ky = y[i]
+            break
+    sx = 0.0
+    sy = 0.0
+    sxx = 0.0
+    syy = 0.0
+    sxy = 0.0
+    nans = 0
+    for i in range(n):
+        dx = x[i] - kx
+        dy = y[i] - ky
+        if np.isnan(dx) or np.isnan(dy):
+            nans += 1
+        else:
+            sx += dx
+            sy += dy
+            sxx += dx * dx
+            syy += dy * dy
+            sxy += dx * dy
+        if i >= w:
+            ox = x[i - w] - kx
+            oy = y[i - w] - ky
+            if np.isnan(ox) or np.isnan(oy):
+                nans -= 1
+            else:
+                sx -= ox
+                sy -= oy
+                sxx -= ox * ox
+                syy -= oy * oy
+                sxy -= ox * oy
+        if i >= w - 1 and nans == 0:
+            vx = w * sxx - sx * sx
+            num = w * sxy - sx * sy
+            if corr:
+                vy = w * syy - sy * sy
+                if vx > 0.0 and vy > 0.0:
+                    out[i] = num / np.sqrt(vx * vy)
+            elif vx > 0.0:
+                out[i] = num / vx
+    return out
+
+@njit(cache=True)
+def _rolling_beta(x, y, w):
+    """Rolling OLS slope of y on x."""
+    return _rolling_pair(x, y, w, False)
+
+@njit(cache=True)
+def _rolling_corr(x, y, w):
+    """Rolling Pearson correlation of x and y."""
+    return _rolling_pair(x, y, w, True)
+
 def rolling_hedge_ratio(y: pd.Series, x: pd.Series, window: int = 60):
-    """Return a Series of hedge ratios computed on rolling windows."""
-    def _win(v):
-        # v contains interleaved x,y columns when applied with rolling apply
-        half = int(len(v) / 2)
-        x_win = pd.Series(v[:half])
-        y_win = pd.Series(v[half:])
-        return hedge_ratio_ols(y_win, x_win)
+    """Return a Series of hedge ratios computed on rolling windows (aligned to right edge)."""
     stacked = pd.concat([x, y], axis=1).dropna()
-    if len(stacked) < window:
-        return pd.Series([np.nan]*len(stacked), index=stacked.index)
-    # sliding by applying on values: (slower but simple). We'll return aligned to right edge.
-    out = stacked.rolling(window=window).apply(
-        lambda arr: hedge_ratio_ols(pd.Series(arr[:,1]), pd.Series(arr[:,0])),
-        raw=True
+    out = _rolling_beta(
+        stacked.iloc[:, 0].to_numpy(dtype=np.float64),
+        stacked.iloc[:, 1].to_numpy(dtype=np.float64),
+        window,
     )
-    # out is DataFrame shaped; first column contains the result (since apply applied to both cols)
-    # Extract first column
-    if hasattr(out, 'iloc'):
-        return out.iloc[:, 0]
+    return pd.Series(out, index=stacked.index)
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _rolling_zscore(x, w):
+    """Rolling z-score (ddof=0), sliding Welford mean/M2 in a single pass; NaN windows give NaN."""
+    n = len(x)
+    out = np.full(n, np.nan)
+    # shift by the first finite sample so mean/M2 updates work on small residuals
+    k = 0.0
+    for i in range(n):
+        if not np.isnan(x[i]):
+            k = x[i]
+            break
+    c = 0
+    mean = 0.0
+    m2 = 0.0
+    nans = 0
+    for i in range(n):
+        v = x[i] - k
+        if np.isnan(v):
+            nans += 1
+        else:
+            c += 1
+            d = v - mean
+            mean += d / c
+            m2 += d * (v - mean)
+        if i >= w:
+            o = x[i - w] - k
+            if np.isnan(o):
+                nans -= 1
+            else:
+                c -= 1
+                if c == 0:
+                    mean = 0.0
+                    m2 = 0.0
+                else:
+                    d = o - mean
+                    mean -= d / c
+                    m2 -= d * (o - mean)
+        if i >= w - 1 and nans == 0:
+            var = m2 / w
+            if var > 0.0:
+                out[i] = (v - mean) / np.sqrt(var)
     return out
 
 def compute_zscore(series: pd.Series, window: int = 60):
-    m = series.rolling(window=window).mean()
-    s = series.rolling(window=window).std(ddof=0)
-    z = (series - m) / s
-    return z
+    z = _rolling_zscore(series.to_numpy(dtype=np.float64), window)
+    return pd.Series(z, index=series.index, name=series.name)
 
 def rolling_corr(s1: pd.Series, s2: pd.Series, window: int = 60):
-    return s1.rolling(window=window).corr(s2)
+    stacked = pd.concat([s1, s2], axis=1)
+    out = _rolling_corr(
+        stacked.iloc[:, 0].to_numpy(dtype=np.float64),
+        stacked.iloc[:, 1].to_numpy(dtype=np.float64),
+        window,
+    )
+    return pd.Series(out, index=stacked.index)
 
 def adf_test(series: pd.Series):
-    s = series.dropna()
+    s = series.to_numpy(dtype=np.float64)
+    s = s[~np.isnan(s)]
     if len(s) < 10:
         return {'stat': None, 'pvalue': None, 'nobs': len(s)}
-    res = adfuller(s, autolag='AIC')
+    # Schwert's rule for maxlag (capped as statsmodels does), fitted once
+    # instead of an AIC search that refits the regression for every lag
+    maxlag = min(int(np.ceil(12 * (len(s) / 100) ** 0.25)), len(s) // 2 - 2)
+    res = adfuller(s, maxlag=maxlag, autolag=None, regression='c')
     return {'stat': float(res[0]), 'pvalue': float(res[1]), 'usedlag': int(res[2]), 'nobs': int(res[3])}
+
+# ---------------------------------------------------------------------
+# NumPy-level API (float64 arrays in, arrays/scalars out; no Series wrapping)
+# ---------------------------------------------------------------------
+def hedge_ratio_array(y: np.ndarray, x: np.ndarray) -> float:
+    """OLS hedge ratio of y on x for NaN-free float64 arrays."""
+    return float(_ols_beta(x, y))
+
+def zscore_array(x: np.ndarray, window: int = 60) -> np.ndarray:
+    """Rolling z-score of a float64 array (compute_zscore without the Series)."""
+    return _rolling_zscore(x, window)
+
+def rolling_corr_array(x: np.ndarray, y: np.ndarray, window: int = 60) -> np.ndarray:
+    """Rolling correlation of two aligned float64 arrays (rolling_corr without the Series)."""
+    return _rolling_corr(x, y, window)
+
+# compile (or load from the on-disk cache) at import, not on the first publish tick
+_warm = np.arange(8, dtype=np.float64)
+hedge_ratio_array(_warm, _warm)
+zscore_array(_warm, 4)
+rolling_corr_array(_warm, _warm, 4)
+_rolling_beta(_warm, _warm, 4)
+del _warm
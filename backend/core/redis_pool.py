@@ -0,0 +1,43 @@
+# backend/core/redis_pool.py
+import os
+from redis import asyncio as aioredis
+from dotenv import load_dotenv
+
+load_dotenv()
+REDIS_HOST = os.getenv("REDIS_HOST", "127.0.0.1")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_DB = int(os.getenv("REDIS_DB", 0))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 64))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5))  # seconds to wait for a free connection
+# one connection per open live stream; redis-py would otherwise cap a pool at 100
+REDIS_PUBSUB_MAX_CONNECTIONS = int(os.getenv("REDIS_PUBSUB_MAX_CONNECTIONS", 10_000))
+
+# Shared pool for request traffic: sockets are reused across requests instead of
+# reconnecting each time. When all are busy, callers wait (up to REDIS_POOL_TIMEOUT)
+# instead of failing immediately with MaxConnectionsError.
+redis_pool = aioredis.BlockingConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+)
+
+# Separate pool for pubsub: every open live WebSocket holds one connection for as
+# long as it is subscribed, so streams must not starve request traffic.
+pubsub_pool = aioredis.ConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    decode_responses=True,
+    max_connections=REDIS_PUBSUB_MAX_CONNECTIONS,
+)
+
+def get_redis() -> aioredis.Redis:
+    """Return a Redis client backed by the shared request pool."""
+    return aioredis.Redis(connection_pool=redis_pool)
+
+def get_pubsub_redis() -> aioredis.Redis:
+    """Return a Redis client for long-lived pubsub subscriptions."""
+    return aioredis.Redis(connection_pool=pubsub_pool)
@@ -1,28 +1,47 @@
 # backend/core/websocket_manager.py
-from typing import List
+import asyncio
+import orjson
+from typing import Dict
 from fastapi import WebSocket
 
+# seconds a single client may take to accept a frame before it is dropped
+SEND_TIMEOUT = 1.0
+
 class WebSocketManager:
     """Manages multiple WebSocket clients."""
 
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        # keyed by id(websocket) for O(1) connect/disconnect
+        self.active_connections: Dict[int, WebSocket] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections[id(websocket)] = websocket
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.pop(id(websocket), None)
 
     async def broadcast(self, message: dict):
-        """Send message to all connected WebSocket clients."""
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                pass  # optionally remove broken connections later
+        """Send message to all connected WebSocket clients (encoded once)."""
+        await self.broadcast_text(orjson.dumps(message).decode())
+
+    async def broadcast_text(self, data: str):
+        """
+        Send an already-encoded JSON string to all clients concurrently.
+        Each send is capped at SEND_TIMEOUT, so a stalled client delays a
+        broadcast by at most that long and is then evicted.
+        """
+        clients = list(self.active_connections.items())
+        if not clients:
+            return
+        results = await asyncio.gather(
+            *(asyncio.wait_for(ws.send_text(data), SEND_TIMEOUT) for _, ws in clients),
+            return_exceptions=True,
+        )
+        # evict broken and timed-out connections in a single pass
+        for (key, _), result in zip(clients, results):
+            if isinstance(result, BaseException):
+                self.active_connections.pop(key, None)
 
 # Create a single shared instance
 ws_manager = WebSocketManager()
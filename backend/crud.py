@@ -1,11 +1,29 @@
 # backend/crud.py
+import logging
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import insert, select
 import pandas as pd
 
-from backend.database import SessionLocal
+from backend.database import SessionLocal, AsyncSessionLocal
 from backend.models import TickData, OHLCV1m, AnalyticsCache
 
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+# ---------------------------------------------------------------------
+# 🕐 Minute Bucket Helper
+# ---------------------------------------------------------------------
+def minute_bucket(ts: datetime) -> int:
+    """UTC minutes since epoch for a naive-UTC timestamp (OHLCV1m.ts_bucket)."""
+    return int((ts - _EPOCH).total_seconds()) // 60
+
+
+def minute_buckets(ts: pd.Series) -> pd.Series:
+    """Vectorised minute_bucket for a Series of naive-UTC timestamps."""
+    return (pd.to_datetime(ts) - _EPOCH) // pd.Timedelta(minutes=1)
+
 
 # ---------------------------------------------------------------------
 # 📥 Insert OHLCV Data (Bulk)
@@ -18,33 +36,27 @@ def insert_ohlcv_bulk(df: pd.DataFrame, symbol: str):
     if df.empty:
         return
 
+    ts = pd.to_datetime(df["ts"])
+    records = (
+        df[["open", "high", "low", "close", "volume"]]
+        .assign(
+            symbol=symbol,
+            ts=ts,
+            ts_bucket=minute_buckets(ts),
+        )
+        .to_dict(orient="records")
+    )
+
     session = SessionLocal()
     try:
-        objs = []
-        for _, row in df.iterrows():
-            ts_val = (
-                row["ts"].to_pydatetime()
-                if hasattr(row["ts"], "to_pydatetime")
-                else row["ts"]
-            )
-            objs.append(
-                OHLCV1m(
-                    symbol=symbol,
-                    ts=ts_val,
-                    open=float(row["open"]),
-                    high=float(row["high"]),
-                    low=float(row["low"]),
-                    close=float(row["close"]),
-                    volume=float(row["volume"]),
-                )
-            )
-
-        session.bulk_save_objects(objs)
+        # Core executemany: no ORM objects; IGNORE skips duplicate keys on MySQL
+        stmt = insert(OHLCV1m).prefix_with("IGNORE", dialect="mysql")
+        session.execute(stmt, records)
         session.commit()
-        print(f"✅ Inserted {len(objs)} OHLCV rows for {symbol}")
+        logger.debug("Inserted %d OHLCV rows for %s", len(records), symbol)
     except Exception as e:
         session.rollback()
-        print(f"❌ insert_ohlcv_bulk error: {e}")
+        logger.error("insert_ohlcv_bulk error: %s", e)
     finally:
         session.close()
 
@@ -52,33 +64,30 @@ def insert_ohlcv_bulk(df: pd.DataFrame, symbol: str):
 # ---------------------------------------------------------------------
 # 📊 Fetch Recent OHLCV Data
 # ---------------------------------------------------------------------
-def get_recent_ohlcv(symbol: str, minutes: int = 120):
+async def get_recent_ohlcv(symbol: str, minutes: int = 120):
     """
     Fetch OHLCV candles for the last 'minutes' minutes.
     Returns a list of dicts [{ts, open, high, low, close, volume}, ...]
     """
-    session = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as session:
         cutoff = datetime.utcnow() - timedelta(minutes=minutes)
-        rows = (
-            session.query(OHLCV1m)
-            .filter(OHLCV1m.symbol == symbol, OHLCV1m.ts >= cutoff)
+        result = await session.execute(
+            select(
+                OHLCV1m.ts,
+                OHLCV1m.open,
+                OHLCV1m.high,
+                OHLCV1m.low,
+                OHLCV1m.close,
+                OHLCV1m.volume,
+            )
+            .where(
+                OHLCV1m.symbol == symbol,
+                OHLCV1m.ts_bucket >= minute_bucket(cutoff),
+                OHLCV1m.ts >= cutoff,
+            )
             .order_by(OHLCV1m.ts)
-            .all()
         )
-        return [
-            {
-                "ts": r.ts,
-                "open": r.open,
-                "high": r.high,
-                "low": r.low,
-                "close": r.close,
-                "volume": r.volume,
-            }
-            for r in rows
-        ]
-    finally:
-        session.close()
+        return [row._asdict() for row in result]
 
 
 # ---------------------------------------------------------------------
@@ -87,12 +96,19 @@ def get_recent_ohlcv(symbol: str, minutes: int = 120):
 def fetch_latest_n_candles(symbol: str, n: int = 500):
     """
     Fetch the most recent N candles for a given symbol.
-    Returns a list of OHLCV1m ORM objects.
+    Returns a list of rows with attributes ts, open, high, low, close, volume.
     """
     session = SessionLocal()
     try:
         rows = (
-            session.query(OHLCV1m)
+            session.query(
+                OHLCV1m.ts,
+                OHLCV1m.open,
+                OHLCV1m.high,
+                OHLCV1m.low,
+                OHLCV1m.close,
+                OHLCV1m.volume,
+            )
             .filter(OHLCV1m.symbol == symbol)
             .order_by(OHLCV1m.ts.desc())
             .limit(n)
@@ -103,6 +119,24 @@ def fetch_latest_n_candles(symbol: str, n: int = 500):
         session.close()
 
 
+def fetch_latest_bar(symbol: str):
+    """
+    (ts, close) of the most recent candle for a symbol, or None.
+    Cheap change signature: the latest bar is upserted in place while it forms.
+    """
+    session = SessionLocal()
+    try:
+        row = (
+            session.query(OHLCV1m.ts, OHLCV1m.close)
+            .filter(OHLCV1m.symbol == symbol)
+            .order_by(OHLCV1m.ts.desc())
+            .first()
+        )
+        return None if row is None else tuple(row)
+    finally:
+        session.close()
+
+
 # ---------------------------------------------------------------------
 # 💾 Upsert Analytics Cache
 # ---------------------------------------------------------------------
@@ -124,9 +158,9 @@ def upsert_analytics_cache(symbol: str, payload_json: str):
             session.add(new_entry)
 
         session.commit()
-        print(f"🧠 Cache updated for {symbol}")
+        logger.debug("Cache updated for %s", symbol)
     except Exception as e:
         session.rollback()
-        print(f"❌ upsert_analytics_cache error: {e}")
+        logger.error("upsert_analytics_cache error: %s", e)
     finally:
         session.close()
\ No newline at end of file
@@ -1,19 +1,28 @@
 # backend/database.py
 import os
-from datetime import datetime
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from sqlalchemy import (
     create_engine,
     Column,
     Integer,
+    SmallInteger,
+    BigInteger,
     String,
     Float,
     DateTime,
     Index,
-    JSON
+    JSON,
+    text
 )
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------
 # Load environment variables
@@ -43,21 +52,40 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# Async engine for FastAPI handlers: DB waits no longer block the event loop
+async_engine = create_async_engine(
+    DB_URL.replace("mysql+pymysql", "mysql+aiomysql"),
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # ---------------------------------------------------------------------
 # ORM Models
 # ---------------------------------------------------------------------
+class Symbol(Base):
+    __tablename__ = "symbols"
+    id = Column(SmallInteger, primary_key=True, autoincrement=True)
+    name = Column(String(32), unique=True, nullable=False)  # lowercase pair, e.g. "btcusdt"
+
 class TickData(Base):
+    # Narrow row, RANGE-partitioned by day on ts (see ensure_tick_partitions).
+    # ts is part of the primary key because MySQL requires the partitioning column
+    # in every unique key; symbol_id has no FK since partitioned InnoDB tables can't.
     __tablename__ = "tickdata"
-    id = Column(Integer, primary_key=True, index=True)
-    symbol = Column(String(64), index=True)
-    ts = Column(DateTime, index=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    ts = Column(DateTime, primary_key=True)
+    symbol_id = Column(SmallInteger, nullable=False)  # symbols.id
     price = Column(Float)
     size = Column(Float)
 
+    __table_args__ = (Index("ix_tick_symbol_ts", "symbol_id", "ts"),)
+
     def __repr__(self):
-        return f"<Tick {self.symbol} {self.ts} {self.price}>"
+        return f"<Tick {self.symbol_id} {self.ts} {self.price}>"
 
 class OHLCV1m(Base):
     __tablename__ = "ohlcv_1m"
@@ -69,8 +97,14 @@ class OHLCV1m(Base):
     low = Column(Float)
     close = Column(Float)
     volume = Column(Float)
+    ts_bucket = Column(BigInteger)  # UTC minutes since epoch, floor(ts / 60s)
 
-    __table_args__ = (Index("ix_ohlcv_symbol_ts", "symbol", "ts"),)
+    __table_args__ = (
+        Index("ix_ohlcv_symbol_ts", "symbol", "ts", unique=True),  # one candle per (symbol, minute)
+        Index("ix_ohlcv_symbol_bucket", "symbol", "ts_bucket"),
+        # covering index for "latest N candles": index-only, already in DESC order
+        Index("ix_ohlcv_cover", "symbol", text("ts DESC"), "open", "high", "low", "close", "volume"),
+    )
 
 class AnalyticsCache(Base):
     __tablename__ = "analytics_cache"
@@ -82,21 +116,181 @@ class AnalyticsCache(Base):
 # ---------------------------------------------------------------------
 # Helper Functions
 # ---------------------------------------------------------------------
+@contextmanager
+def _named_lock(conn, name: str, timeout: int = 30):
+    """Hold MySQL named lock `name` on `conn`; yields False if not acquired in time."""
+    # GET_LOCK is held per connection, so overlapping runs queue here
+    acquired = conn.execute(text("SELECT GET_LOCK(:n, :t)"), {"n": name, "t": timeout}).scalar() == 1
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            conn.execute(text("SELECT RELEASE_LOCK(:n)"), {"n": name})
+
 def create_tables():
-    """Create all defined tables in MySQL database."""
-    Base.metadata.create_all(bind=engine)
-    print("✅ All database tables created successfully.")
+    """
+    Create all defined tables in MySQL database. Run from the CLI
+    (python -m backend.database), not API startup; concurrent runs are
+    serialised with a MySQL named lock so CREATE TABLE never races.
+    """
+    with engine.connect() as conn, _named_lock(conn, "quant_schema") as acquired:
+        if not acquired:
+            logger.warning("Schema setup is already running elsewhere; skipped.")
+            return
+        Base.metadata.create_all(bind=engine)
+    logger.info("All database tables created successfully.")
 
-def get_db():
-    """FastAPI dependency: yield a database session."""
-    db = SessionLocal()
+def migrate_schema():
+    """
+    Bring tables created by older versions to the current layout, which
+    create_all() does not do for tables that already exist:
+      - tickdata: fill `symbols`, backfill symbol_id, drop symbol and rebuild
+        the primary key as (id, ts);
+      - ohlcv_1m: drop duplicate (symbol, ts) candles and make
+        ix_ohlcv_symbol_ts UNIQUE, which persist_1m_ohlcv's upsert relies on.
+    Each step checks information_schema first, so the migration is idempotent
+    and resumes where an interrupted run stopped. Run from the CLI after
+    create_tables(); failures are logged, not raised.
+    """
     try:
+        with engine.connect() as conn, _named_lock(conn, "quant_schema") as acquired:
+            if not acquired:
+                logger.warning("Schema migration is already running elsewhere; skipped.")
+                return
+            for table, step in (("tickdata", _migrate_tickdata), ("ohlcv_1m", _migrate_ohlcv)):
+                try:
+                    step(conn)
+                except SQLAlchemyError as e:
+                    conn.rollback()
+                    logger.error("%s migration failed: %s", table, e)
+    except SQLAlchemyError as e:
+        logger.error("Schema migration failed: %s", e)
+
+def _table_columns(conn, table: str) -> set:
+    return set(conn.execute(text(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"
+    ), {"t": table}).scalars())
+
+def _index_columns(conn, table: str, index: str) -> list:
+    return list(conn.execute(text(
+        "SELECT COLUMN_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND INDEX_NAME = :i "
+        "ORDER BY SEQ_IN_INDEX"
+    ), {"t": table, "i": index}).scalars())
+
+def _migrate_tickdata(conn):
+    cols = _table_columns(conn, "tickdata")
+    if not cols:
+        return  # no table yet; create_tables() builds it in the current layout
+    if "symbol" in cols:
+        logger.info("Migrating tickdata.symbol to symbol_id ...")
+        conn.execute(text(
+            "INSERT IGNORE INTO symbols (name) SELECT DISTINCT LOWER(symbol) FROM tickdata"
+        ))
+        conn.commit()
+        if "symbol_id" not in cols:
+            conn.execute(text("ALTER TABLE tickdata ADD COLUMN symbol_id SMALLINT NULL"))
+        conn.execute(text(
+            "UPDATE tickdata t JOIN symbols s ON s.name = LOWER(t.symbol) "
+            "SET t.symbol_id = s.id WHERE t.symbol_id IS NULL"
+        ))
+        conn.commit()
+        conn.execute(text(
+            "ALTER TABLE tickdata MODIFY symbol_id SMALLINT NOT NULL, DROP COLUMN symbol"
+        ))
+
+    if _index_columns(conn, "tickdata", "PRIMARY") != ["id", "ts"]:
+        logger.info("Rebuilding tickdata primary key as (id, ts) ...")
+        conn.execute(text(
+            "ALTER TABLE tickdata MODIFY id BIGINT NOT NULL AUTO_INCREMENT, "
+            "DROP PRIMARY KEY, ADD PRIMARY KEY (id, ts)"
+        ))
+
+    if not _index_columns(conn, "tickdata", "ix_tick_symbol_ts"):
+        conn.execute(text("CREATE INDEX ix_tick_symbol_ts ON tickdata (symbol_id, ts)"))
+        logger.info("Created index ix_tick_symbol_ts on tickdata.")
+
+def _migrate_ohlcv(conn):
+    non_unique = conn.execute(text(
+        "SELECT MAX(NON_UNIQUE) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'ohlcv_1m' "
+        "AND INDEX_NAME = 'ix_ohlcv_symbol_ts'"
+    )).scalar()
+    if non_unique == 0 or not _table_columns(conn, "ohlcv_1m"):
+        return
+    logger.info("Making ix_ohlcv_symbol_ts unique ...")
+    # keep the first-inserted row (MIN(id)) of each (symbol, ts)
+    deleted = conn.execute(text(
+        "DELETE o FROM ohlcv_1m o JOIN ohlcv_1m k "
+        "ON k.symbol = o.symbol AND k.ts = o.ts AND k.id < o.id"
+    )).rowcount
+    conn.commit()
+    drop = "DROP INDEX ix_ohlcv_symbol_ts, " if non_unique is not None else ""
+    conn.execute(text(
+        f"ALTER TABLE ohlcv_1m {drop}ADD UNIQUE INDEX ix_ohlcv_symbol_ts (symbol, ts)"
+    ))
+    logger.info("ix_ohlcv_symbol_ts is now unique (%d duplicate candles removed).", deleted)
+
+def ensure_tick_partitions(days_ahead: int = 3):
+    """
+    Keep `tickdata` RANGE-partitioned by day (TO_DAYS(ts)) with partitions
+    through today + days_ahead, split off the catch-all `p_future`.
+    Idempotent; run daily from cron (python -m backend.database), not from
+    API startup. Concurrent runs are serialised with a MySQL named lock;
+    failures are logged, not raised.
+    """
+    try:
+        with engine.connect() as conn, _named_lock(conn, "tickdata_partitions") as acquired:
+            if not acquired:
+                logger.warning("tickdata partition maintenance is already running; skipped.")
+                return
+            _add_tick_partitions(conn, days_ahead)
+    except SQLAlchemyError as e:
+        logger.error("tickdata partition maintenance failed: %s", e)
+
+def _add_tick_partitions(conn, days_ahead: int):
+    names = set(conn.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tickdata' "
+        "AND PARTITION_NAME IS NOT NULL"
+    )).scalars())
+    if not names:
+        # requires the (id, ts) primary key that migrate_schema() puts in place
+        conn.execute(text(
+            "ALTER TABLE tickdata PARTITION BY RANGE (TO_DAYS(ts)) "
+            "(PARTITION p_future VALUES LESS THAN MAXVALUE)"
+        ))
+        names = {"p_future"}
+
+    # daily partitions are named pYYYYMMDD and hold ts < the next midnight
+    days = {datetime.strptime(n[1:], "%Y%m%d").date() for n in names if n != "p_future"}
+    start = max(days) + timedelta(days=1) if days else datetime.utcnow().date()
+    end = datetime.utcnow().date() + timedelta(days=days_ahead)
+    new = []
+    day = start
+    while day <= end:
+        upper = day + timedelta(days=1)
+        new.append(f"PARTITION p{day:%Y%m%d} VALUES LESS THAN (TO_DAYS('{upper:%Y-%m-%d}'))")
+        day = upper
+    if new:
+        conn.execute(text(
+            "ALTER TABLE tickdata REORGANIZE PARTITION p_future INTO ("
+            + ", ".join(new)
+            + ", PARTITION p_future VALUES LESS THAN MAXVALUE)"
+        ))
+        logger.info("Added %d tickdata partitions (through %s).", len(new), end)
+
+async def get_db():
+    """FastAPI dependency: yield an async database session."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # ---------------------------------------------------------------------
 # CLI Entry Point
 # ---------------------------------------------------------------------
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     create_tables()
+    migrate_schema()
+    ensure_tick_partitions()
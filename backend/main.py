@@ -1,13 +1,12 @@
 # backend/main.py
 import os
 import asyncio
-import json
+import logging
 import uvicorn
 import redis.asyncio as aioredis
 from fastapi import FastAPI
 
 # Internal imports
-from backend.database import create_tables  # replaces old init_db()
 from backend.api.historical_data import router as hist_router
 from backend.api.real_time import router as rt_router
 from backend.core.websocket_manager import ws_manager 
@@ -19,6 +18,8 @@ from fastapi.middleware.cors import CORSMiddleware
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 REDIS_CHANNEL = os.getenv("REDIS_CHANNEL", "live_analytics")
 
+logger = logging.getLogger(__name__)
+
 # ---------------------------------------------------------------------
 # FastAPI App Setup
 # ---------------------------------------------------------------------
@@ -50,13 +51,13 @@ app.include_router(rt_router)
 @app.on_event("startup")
 async def startup_event():
     """Runs when FastAPI starts."""
-    # ✅ Ensure DB tables exist
-    create_tables()
+    # Schema setup is not done here: every uvicorn worker runs this hook, so
+    # tables are created once via `python -m backend.database` before launch.
 
     # ✅ Connect to Redis and start the subscriber task
     app.state.redis = aioredis.from_url(REDIS_URL, decode_responses=True)
     app.state._redis_task = asyncio.create_task(_redis_listener(app.state.redis))
-    print(f"🚀 FastAPI started with Redis listener on {REDIS_CHANNEL}")
+    logger.info("FastAPI started with Redis listener on %s", REDIS_CHANNEL)
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -68,7 +69,7 @@ async def shutdown_event():
     redis_client = getattr(app.state, "redis", None)
     if redis_client:
         await redis_client.close()
-        print("🧹 Redis connection closed.")
+        logger.info("Redis connection closed.")
 
 # ---------------------------------------------------------------------
 # Redis Pub/Sub Listener
@@ -80,7 +81,7 @@ async def _redis_listener(redis_client):
     """
     pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
     await pubsub.subscribe(REDIS_CHANNEL)
-    print(f"📡 Subscribed to Redis channel: {REDIS_CHANNEL}")
+    logger.info("Subscribed to Redis channel: %s", REDIS_CHANNEL)
 
     try:
         async for message in pubsub.listen():
@@ -92,20 +93,15 @@ async def _redis_listener(redis_client):
             if not data:
                 continue
 
-            try:
-                payload = json.loads(data)
-            except json.JSONDecodeError:
-                print("⚠️ Invalid JSON in Redis message.")
-                continue
-
-            # Broadcast to all active WebSocket clients
-            await ws_manager.broadcast_json(payload)
+            # Payload is already JSON: forward it as-is, no decode/re-encode round-trip.
+            # Nothing is logged per message; only subscribe/unsubscribe/errors.
+            await ws_manager.broadcast_text(data)
 
     except asyncio.CancelledError:
         await pubsub.unsubscribe(REDIS_CHANNEL)
-        print("🛑 Redis listener task cancelled.")
+        logger.info("Redis listener cancelled, unsubscribed from %s", REDIS_CHANNEL)
     except Exception as e:
-        print(f"❌ Redis listener error: {e}")
+        logger.error("Redis listener error: %s", e)
         try:
             await pubsub.unsubscribe(REDIS_CHANNEL)
         except Exception:
@@ -115,9 +111,16 @@ async def _redis_listener(redis_client):
 # Entry Point
 # ---------------------------------------------------------------------
 if __name__ == "__main__":
+    # uvloop event loop + httptools parser; auto-reload only for local dev (RELOAD=1)
+    reload = os.getenv("RELOAD", "0") == "1"
     uvicorn.run(
         "backend.main:app",
         host="0.0.0.0",
         port=int(os.getenv("PORT", "8000")),
-        reload=True
+        loop=os.getenv("UVICORN_LOOP", "uvloop"),
+        http="httptools",
+        workers=1 if reload else int(os.getenv("WEB_CONCURRENCY", "2")),
+        access_log=os.getenv("UVICORN_NO_ACCESS_LOG", "0") != "1",
+        log_level=os.getenv("LOG_LEVEL", "warning").lower(),
+        reload=reload
     )
\ No newline at end of file
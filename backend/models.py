@@ -1,18 +1,28 @@
 # backend/models.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, BigInteger, Index
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, DateTime, BigInteger, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
 Base = declarative_base()
 
+class Symbol(Base):
+    __tablename__ = 'symbols'
+    id = Column(SmallInteger, primary_key=True, autoincrement=True)
+    name = Column(String(32), unique=True, nullable=False)  # lowercase pair, e.g. 'btcusdt'
+
 class TickData(Base):
+    # Narrow row, RANGE-partitioned by day on ts (see database.ensure_tick_partitions).
+    # ts is part of the primary key because MySQL requires the partitioning column
+    # in every unique key; symbol_id has no FK since partitioned InnoDB tables can't.
     __tablename__ = 'tickdata'
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    symbol = Column(String(32), index=True, nullable=False)
-    ts = Column(DateTime, index=True, nullable=False)  # timestamp
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    ts = Column(DateTime, primary_key=True, nullable=False)  # timestamp
+    symbol_id = Column(SmallInteger, nullable=False)  # symbols.id
     price = Column(Float, nullable=False)
     size = Column(Float, nullable=True)
 
+    __table_args__ = (Index('ix_tick_symbol_ts', 'symbol_id', 'ts'),)
+
 class OHLCV1m(Base):
     __tablename__ = 'ohlcv_1m'
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -23,8 +33,14 @@ class OHLCV1m(Base):
     low = Column(Float)
     close = Column(Float)
     volume = Column(Float)
+    ts_bucket = Column(BigInteger)  # UTC minutes since epoch, floor(ts / 60s)
 
-    __table_args__ = (Index('ix_ohlcv_symbol_ts', 'symbol', 'ts'),)
+    __table_args__ = (
+        Index('ix_ohlcv_symbol_ts', 'symbol', 'ts', unique=True),  # one candle per (symbol, minute)
+        Index('ix_ohlcv_symbol_bucket', 'symbol', 'ts_bucket'),
+        # covering index for "latest N candles": index-only, already in DESC order
+        Index('ix_ohlcv_cover', 'symbol', text('ts DESC'), 'open', 'high', 'low', 'close', 'volume'),
+    )
 
 class AnalyticsCache(Base):
     __tablename__ = 'analytics_cache'
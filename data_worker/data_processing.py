@@ -4,10 +4,20 @@ Handles tick-to-OHLCV resampling and persistence logic.
 Now uses new Pandas frequency codes ('min', 's') to avoid deprecation warnings.
 """
 
-from backend.database import SessionLocal, TickData, OHLCV1m
+import logging
+
+from backend.database import SessionLocal, Symbol, TickData, OHLCV1m
+from backend.crud import minute_buckets
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+TICK_BATCH_ROWS = 1000
+
 
 def ticks_to_ohlcv(symbol: str, freq: str = '1min', minutes: int = 60):
     """
@@ -23,27 +33,46 @@ def ticks_to_ohlcv(symbol: str, freq: str = '1min', minutes: int = 60):
     """
     session = SessionLocal()
     try:
-        since = datetime.utcnow() - timedelta(minutes=minutes)
-        rows = (
-            session.query(TickData)
-            .filter(TickData.symbol == symbol.lower(), TickData.ts >= since)
+        # Ensure backward-compatible frequency naming
+        # Replace deprecated aliases: 'T' → 'min', 'S' → 's'
+        freq = freq.replace('T', 'min').replace('S', 's')
+
+        # start on a bin boundary: the oldest bucket must cover its whole interval,
+        # or the upsert in persist_1m_ohlcv would overwrite a complete stored candle
+        # with a partial one
+        since = pd.Timestamp(datetime.utcnow() - timedelta(minutes=minutes)).floor(freq).to_pydatetime()
+        # ordered range scan on ix_tick_symbol_ts (symbol_id, ts): no filesort;
+        # streamed server-side in TICK_BATCH_ROWS chunks instead of one list
+        stmt = (
+            select(TickData.ts, TickData.price, TickData.size)
+            .join(Symbol, Symbol.id == TickData.symbol_id)
+            .where(Symbol.name == symbol.lower(), TickData.ts >= since)
             .order_by(TickData.ts)
-            .all()
+            .execution_options(stream_results=True, yield_per=TICK_BATCH_ROWS)
         )
-        if not rows:
+        ts_parts, price_parts, size_parts = [], [], []
+        for rows in session.execute(stmt).partitions():
+            # columnar, typed buffers straight from each chunk of row tuples
+            ts, price, size = zip(*rows)
+            ts_parts.append(np.asarray(ts, dtype='datetime64[ns]'))
+            price_parts.append(np.asarray(price, dtype=np.float64))
+            size_parts.append(np.asarray(size, dtype=np.float64))
+        if not ts_parts:
             return pd.DataFrame()
 
-        df = pd.DataFrame([{"ts": r.ts, "price": r.price, "size": r.size} for r in rows])
-        df.set_index(pd.DatetimeIndex(df['ts']), inplace=True)
-
-        # Ensure backward-compatible frequency naming
-        # Replace deprecated aliases: 'T' → 'min', 'S' → 's'
-        freq = freq.replace('T', 'min').replace('S', 's')
+        df = pd.DataFrame(
+            {
+                'price': np.concatenate(price_parts),
+                'size': np.concatenate(size_parts),
+            },
+            index=pd.DatetimeIndex(np.concatenate(ts_parts), name='ts'),
+            copy=False,
+        )
 
-        # Resample into OHLCV
-        ohlc = df['price'].resample(freq).ohlc()
-        vol = df['size'].resample(freq).sum().rename('volume')
-        out = ohlc.join(vol)
+        # Resample into OHLCV: one resampler (bins computed once), no join
+        resampler = df.resample(freq)
+        out = resampler['price'].ohlc()
+        out['volume'] = resampler['size'].sum()
         out = out.dropna(subset=['open'])
         out.reset_index(inplace=True)
         return out
@@ -55,49 +84,48 @@ def ticks_to_ohlcv(symbol: str, freq: str = '1min', minutes: int = 60):
 def persist_1m_ohlcv(symbol: str, minutes: int = 60):
     """
     Compute 1-minute OHLCV candles and persist them into MySQL.
-    Skips duplicates if candles already exist.
+    Existing candles are updated in place (the latest bar is usually
+    still forming), in a single INSERT ... ON DUPLICATE KEY UPDATE.
     
     Args:
         symbol (str): e.g. 'btcusdt'
         minutes (int): how far back to aggregate
     Returns:
-        int: number of new rows inserted
+        int: number of candles written (inserted or updated)
     """
     df = ticks_to_ohlcv(symbol, freq='1min', minutes=minutes)
     if df.empty:
         return 0
 
+    ts = pd.to_datetime(df['ts'])
+    records = (
+        df[['open', 'high', 'low', 'close']]
+        .assign(
+            symbol=symbol,
+            ts=ts,
+            ts_bucket=minute_buckets(ts),
+            volume=df['volume'].fillna(0.0),
+        )
+        .to_dict('records')
+    )
+
     session = SessionLocal()
-    count = 0
     try:
-        for _, row in df.iterrows():
-            ts = row['ts'].to_pydatetime()
-            exists = (
-                session.query(OHLCV1m)
-                .filter(OHLCV1m.symbol == symbol, OHLCV1m.ts == ts)
-                .first()
-            )
-            if exists:
-                continue
-
-            rec = OHLCV1m(
-                symbol=symbol,
-                ts=ts,
-                open=float(row['open']),
-                high=float(row['high']),
-                low=float(row['low']),
-                close=float(row['close']),
-                volume=float(row['volume']) if not pd.isna(row['volume']) else 0.0,
-            )
-            session.add(rec)
-            count += 1
-
+        # relies on the UNIQUE (symbol, ts) index ix_ohlcv_symbol_ts
+        stmt = insert(OHLCV1m).values(records)
+        stmt = stmt.on_duplicate_key_update(
+            high=stmt.inserted.high,
+            low=stmt.inserted.low,
+            close=stmt.inserted.close,
+            volume=stmt.inserted.volume,
+        )
+        session.execute(stmt)
         session.commit()
-        return count
+        return len(records)
 
     except Exception as e:
         session.rollback()
-        print(f"[persist_1m_ohlcv] Error: {e}")
+        logger.error("persist_1m_ohlcv error: %s", e)
         return 0
     finally:
         session.close()
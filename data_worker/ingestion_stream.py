@@ -1,16 +1,33 @@
 import asyncio
-import json
+import orjson
 import datetime
 import logging
 import websockets
-import pymysql
+import asyncmy
 from backend.config import get_settings
 
+try:
+    import uvloop  # optional, faster event loop (ships with uvicorn[standard])
+except ImportError:
+    uvloop = None
+
 # ---------------------------------------------------------------------
 # Load configuration
 # ---------------------------------------------------------------------
 settings = get_settings()
 
+# ticks are queued by the collectors and written in batches by db_writer()
+TICK_BATCH_SIZE = 500
+TICK_FLUSH_INTERVAL = 0.1  # seconds
+tick_queue: asyncio.Queue = asyncio.Queue(maxsize=10_000)
+DROP_LOG_INTERVAL = 1.0  # seconds between "queue full" summaries per symbol
+
+# statements built once; the driver has no server-side prepare, so each batch is
+# sent as a single multi-row INSERT rewritten from this template by executemany
+INSERT_TICKS_SQL = "INSERT INTO tickdata (symbol_id, ts, price, size) VALUES (%s, %s, %s, %s)"
+SELECT_SYMBOL_SQL = "SELECT id FROM symbols WHERE name = %s"
+INSERT_SYMBOL_SQL = "INSERT IGNORE INTO symbols (name) VALUES (%s)"
+
 # ---------------------------------------------------------------------
 # Logging setup
 # ---------------------------------------------------------------------
@@ -21,15 +38,18 @@ logging.basicConfig(
 )
 
 # ---------------------------------------------------------------------
-# Database connection helper
+# Database connection pool
 # ---------------------------------------------------------------------
-def get_db_connection():
-    """Create a new MySQL connection using settings from .env"""
-    return pymysql.connect(
+async def create_db_pool():
+    """Create an asyncio MySQL connection pool using settings from .env"""
+    return await asyncmy.create_pool(
         host=settings.MYSQL_HOST,
+        port=settings.MYSQL_PORT,
         user=settings.MYSQL_USER,
         password=settings.MYSQL_PASSWORD,
-        database=settings.MYSQL_DB,
+        db=settings.MYSQL_DB,
+        minsize=2,
+        maxsize=8,
         autocommit=True
     )
 
@@ -47,38 +67,84 @@ def normalize_trade(trade: dict) -> dict:
     }
 
 # ---------------------------------------------------------------------
-# Insert tick data into DB
+# Resolve symbol -> symbols.id
+# ---------------------------------------------------------------------
+async def get_symbol_id(pool, symbol: str) -> int:
+    """Return symbols.id for a lowercase symbol, registering it on first use."""
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(SELECT_SYMBOL_SQL, (symbol,))
+            row = await cur.fetchone()
+            if row is None:
+                await cur.execute(INSERT_SYMBOL_SQL, (symbol,))
+                await cur.execute(SELECT_SYMBOL_SQL, (symbol,))
+                row = await cur.fetchone()
+    return row[0]
+
+# ---------------------------------------------------------------------
+# Insert tick data into DB (batched)
 # ---------------------------------------------------------------------
-def insert_tick(conn, data: dict):
-    """Insert tick into tickdata table."""
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO tickdata (symbol, ts, price, size) VALUES (%s, %s, %s, %s)",
-                (data["symbol"], data["ts"], data["price"], data["size"])
-            )
-    except Exception as e:
-        logging.error(f"MySQL insert failed for {data['symbol']}: {e}")
+async def insert_ticks(pool, rows: list[tuple]):
+    """Insert (symbol_id, ts, price, size) rows into tickdata in one executemany."""
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            # the driver folds this into a single multi-row INSERT
+            await cur.executemany(INSERT_TICKS_SQL, rows)
+
+async def db_writer(pool):
+    """Drain tick_queue, flushing every TICK_BATCH_SIZE ticks or TICK_FLUSH_INTERVAL seconds."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await tick_queue.get()]
+        deadline = loop.time() + TICK_FLUSH_INTERVAL
+        while len(batch) < TICK_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(tick_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            await insert_ticks(pool, batch)
+        except Exception as e:
+            logging.error(f"MySQL batch insert of {len(batch)} ticks failed: {e}")
 
 # ---------------------------------------------------------------------
 # Async listener for a single symbol
 # ---------------------------------------------------------------------
-async def collect_symbol(symbol: str):
-    """Connect to Binance WebSocket and continuously insert ticks for a symbol."""
+async def collect_symbol(pool, symbol: str):
+    """Connect to Binance WebSocket and continuously queue ticks for a symbol."""
     url = f"wss://fstream.binance.com/ws/{symbol}@trade"
     logging.info(f"Connecting WebSocket for {symbol} -> {url}")
+    loop = asyncio.get_running_loop()
+    dropped, last_drop_log = 0, loop.time()
 
     while True:
         try:
-            async with websockets.connect(url, ping_interval=20, ping_timeout=20) as ws:
-                conn = get_db_connection()
+            async with websockets.connect(
+                url,
+                ping_interval=20,
+                ping_timeout=20,
+                compression=None,  # Binance trade frames are small, uncompressed JSON
+                max_size=2**20,
+            ) as ws:
+                symbol_id = await get_symbol_id(pool, symbol.lower())
                 logging.info(f"Connected: {symbol}")
                 async for msg in ws:
                     try:
-                        j = json.loads(msg)
+                        j = orjson.loads(msg)
                         if j.get("e") == "trade":
                             tick = normalize_trade(j)
-                            insert_tick(conn, tick)
+                            tick_queue.put_nowait((symbol_id, tick["ts"], tick["price"], tick["size"]))
+                    except asyncio.QueueFull:
+                        # count drops; one summary per interval instead of a line per tick
+                        dropped += 1
+                        now = loop.time()
+                        if now - last_drop_log >= DROP_LOG_INTERVAL:
+                            logging.warning(f"Tick queue full, dropped {dropped} {symbol} ticks in the last {now - last_drop_log:.1f}s")
+                            dropped, last_drop_log = 0, now
                     except Exception as ex:
                         logging.error(f"Error parsing message for {symbol}: {ex}")
         except Exception as e:
@@ -92,11 +158,20 @@ async def collect_symbol(symbol: str):
 def subscribe_symbols(symbols: list[str]):
     """Subscribe to multiple Binance symbols concurrently."""
     async def runner():
-        tasks = [asyncio.create_task(collect_symbol(sym)) for sym in symbols]
-        await asyncio.gather(*tasks)
+        pool = await create_db_pool()
+        try:
+            tasks = [asyncio.create_task(collect_symbol(pool, sym)) for sym in symbols]
+            tasks.append(asyncio.create_task(db_writer(pool)))
+            await asyncio.gather(*tasks)
+        finally:
+            pool.close()
+            await pool.wait_closed()
 
     logging.info(f"Launching collectors for: {', '.join(symbols)}")
-    asyncio.run(runner())
+    if uvloop is not None:
+        uvloop.run(runner())
+    else:
+        asyncio.run(runner())
 
 # ---------------------------------------------------------------------
 # Standalone test mode
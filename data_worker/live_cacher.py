@@ -1,35 +1,107 @@
 # data_worker/live_cacher.py
 import os
-import json
-import time
+import asyncio
+import logging
 import redis
+import orjson
+import numpy as np
 import pandas as pd
-from backend.crud import fetch_latest_n_candles
-from backend.core.analytics import hedge_ratio_ols, compute_spread, compute_zscore, rolling_corr
+from operator import attrgetter
+from backend.crud import fetch_latest_n_candles, fetch_latest_bar
+from backend.core.analytics import hedge_ratio_array, zscore_array, rolling_corr_array
 from datetime import datetime
 
+try:
+    import uvloop  # optional, faster event loop (ships with uvicorn[standard])
+except ImportError:
+    uvloop = None
+
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 REDIS_CHANNEL = os.getenv("REDIS_CHANNEL", "live_analytics")
 PUBLISH_INTERVAL = float(os.getenv("PUBLISH_INTERVAL", "1.0"))  # seconds
 ROLLING_WINDOW = int(os.getenv("ROLLING_WINDOW", "60"))
+CANDLE_CACHE_TTL = int(os.getenv("CANDLE_CACHE_TTL", "300"))  # seconds
+
+logger = logging.getLogger(__name__)
 
 # sync redis client (simple)
 r = redis.from_url(REDIS_URL)
 
+_ts_close = attrgetter("ts", "close")
+
+# last computed payload per (y, x), keyed by the latest (ts, close) of both legs
+_LAST_SIG = {}
+_LAST_PAYLOAD = {}
+
 def rows_to_series(rows):
-    # rows: list of OHLCV1m ORM rows from crud.fetch_latest_n_candles
+    # rows: list of OHLCV1m rows from crud.fetch_latest_n_candles
     if not rows:
         return pd.Series(dtype=float)
-    idx = [r.ts for r in rows]
-    close = [r.close for r in rows]
-    return pd.Series(close, index=pd.to_datetime(idx))
+    # one C-level pass over the rows, then straight into typed buffers
+    ts, close = zip(*map(_ts_close, rows))
+    n = len(rows)
+    ts_arr = np.fromiter(ts, dtype="datetime64[ns]", count=n)
+    close_arr = np.fromiter(close, dtype=np.float64, count=n)
+    return pd.Series(close_arr, index=pd.DatetimeIndex(ts_arr), copy=False)
+
+def load_close_series(symbol, n, sig):
+    """
+    Last n closes for a symbol. sig is the leg's latest bar (ts, close) from
+    fetch_latest_bar. The Redis hash cand:{symbol}:{n} (raw int64/float64
+    buffers) is keyed on the latest bar's ts only: while that bar is forming
+    its close is spliced in from sig, so MySQL is re-read only when a new bar
+    appears.
+    """
+    if sig is None:
+        return pd.Series(dtype=float)  # no candles yet
+    last_ts, last_close = sig
+    key = f"cand:{symbol}:{n}"
+    bar_b = orjson.dumps(last_ts)
+    try:
+        cached_bar, ts_b, close_b = r.hmget(key, "bar", "ts", "close")
+    except redis.RedisError as e:
+        logger.warning("candle cache read failed (%s): %s", key, e)
+        cached_bar = None
+    if cached_bar == bar_b and ts_b:
+        close = np.frombuffer(close_b, dtype=np.float64).copy()  # frombuffer views are read-only
+        close[-1] = last_close
+        return pd.Series(
+            close,
+            index=pd.DatetimeIndex(np.frombuffer(ts_b, dtype="datetime64[ns]")),
+            copy=False,
+        )
+
+    s = rows_to_series(fetch_latest_n_candles(symbol, n=n))
+    if not s.empty:
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.hset(key, mapping={
+                # the bar actually read, which may be newer than sig's
+                "bar": orjson.dumps(s.index[-1].to_pydatetime()),
+                "ts": s.index.to_numpy(dtype="datetime64[ns]").tobytes(),
+                "close": s.to_numpy(dtype=np.float64).tobytes(),
+            })
+            pipe.expire(key, CANDLE_CACHE_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("candle cache write failed (%s): %s", key, e)
+    return s
 
 def build_payload(symbol_y, symbol_x):
-    # fetch last N candles for both symbols
-    rows_y = fetch_latest_n_candles(symbol_y, n=ROLLING_WINDOW+10)
-    rows_x = fetch_latest_n_candles(symbol_x, n=ROLLING_WINDOW+10)
-    s_y = rows_to_series(rows_y)
-    s_x = rows_to_series(rows_x)
+    # candles unchanged since the last publish: reuse the payload, refresh only ts
+    key = (symbol_y, symbol_x)
+    sig = (fetch_latest_bar(symbol_y), fetch_latest_bar(symbol_x))
+    if _LAST_SIG.get(key) == sig:
+        return {**_LAST_PAYLOAD[key], "ts": datetime.utcnow().isoformat()}
+    payload = _compute_payload(symbol_y, symbol_x, *sig)
+    _LAST_SIG[key] = sig
+    _LAST_PAYLOAD[key] = payload
+    return payload
+
+def _compute_payload(symbol_y, symbol_x, sig_y, sig_x):
+    # last N candles for both symbols; a leg with no new bar since the last read comes from Redis
+    s_y = load_close_series(symbol_y, ROLLING_WINDOW+10, sig_y)
+    s_x = load_close_series(symbol_x, ROLLING_WINDOW+10, sig_x)
     payload = {"symbol_y": symbol_y, "symbol_x": symbol_x, "ts": datetime.utcnow().isoformat()}
     if len(s_y) < 10 or len(s_x) < 10:
         payload.update({"status": "insufficient_data"})
@@ -39,38 +111,55 @@ def build_payload(symbol_y, symbol_x):
     if df.empty:
         payload.update({"status": "insufficient_align"})
         return payload
+    # straight to the numba kernels on float64 arrays; only the last values are published
+    y = df['y'].to_numpy()
+    x = df['x'].to_numpy()
     # compute hedge ratio on last ROLLING_WINDOW
-    y = df['y'].iloc[-ROLLING_WINDOW:]
-    x = df['x'].iloc[-ROLLING_WINDOW:]
-    hr = hedge_ratio_ols(y, x)
-    spread = compute_spread(df['y'], df['x'], hr)
-    z = compute_zscore(spread, window=min(ROLLING_WINDOW, max(5, int(len(spread)/2))))
-    z_latest = None
-    try:
-        z_latest = None if z.dropna().empty else float(z.iloc[-1])
-    except Exception:
-        z_latest = None
-    corr_series = rolling_corr(df['y'], df['x'], window=min(ROLLING_WINDOW, len(df)))
-    corr_latest = None if corr_series.dropna().empty else float(corr_series.iloc[-1])
+    hr = hedge_ratio_array(y[-ROLLING_WINDOW:], x[-ROLLING_WINDOW:])
+    spread = y - hr * x
+    z = zscore_array(spread, min(ROLLING_WINDOW, max(5, int(len(spread)/2))))
+    z_latest = None if np.isnan(z).all() else float(z[-1])
+    corr = rolling_corr_array(y, x, min(ROLLING_WINDOW, len(y)))
+    corr_latest = None if np.isnan(corr).all() else float(corr[-1])
     payload.update({
-        "hedge_ratio": None if hr is None else float(hr),
+        "hedge_ratio": hr,
         "zscore": z_latest,
-        "spread": None if spread.empty else float(spread.iloc[-1]),
+        "spread": float(spread[-1]),
         "rolling_corr": corr_latest,
         "status": "ok",
     })
     return payload
 
-def publisher_loop(pairs):
+async def publisher_loop(pairs):
     """pairs: list of (symbol_y, symbol_x) e.g. [('btcusdt','ethusdt')]"""
+    loop = asyncio.get_running_loop()
+    next_wake = loop.time()
     while True:
-        for (y, x) in pairs:
-            try:
-                p = build_payload(y, x)
-                r.publish(REDIS_CHANNEL, json.dumps(p))
-            except Exception as e:
-                print("publish error", e)
-        time.sleep(PUBLISH_INTERVAL)
+        # pairs are built concurrently (sync DB/Redis work runs in worker threads)
+        results = await asyncio.gather(
+            *(asyncio.to_thread(build_payload, y, x) for (y, x) in pairs),
+            return_exceptions=True,
+        )
+        # one round trip per interval for all pairs
+        pipe = r.pipeline(transaction=False)
+        for (y, x), p in zip(pairs, results):
+            if isinstance(p, Exception):
+                logger.warning("payload error for %s/%s: %s", y, x, p)
+                continue
+            pipe.publish(REDIS_CHANNEL, orjson.dumps(p))
+        try:
+            await asyncio.to_thread(pipe.execute)
+        except redis.RedisError as e:
+            logger.warning("publish error: %s", e)
+
+        # fixed cadence on the monotonic clock: sleep to the next boundary, not for a
+        # full interval after the work; after an overrun, restart from now (no burst)
+        next_wake += PUBLISH_INTERVAL
+        delay = next_wake - loop.time()
+        if delay < 0:
+            next_wake = loop.time()
+            delay = 0
+        await asyncio.sleep(delay)
 
 if __name__ == "__main__":
     # example: environment variable PAIRS="btcusdt:ethusdt,linkusdt:ethusdt"
@@ -80,5 +169,9 @@ if __name__ == "__main__":
         if ":" in part:
             a,b = part.split(":")
             pairs.append((a.strip().lower(), b.strip().lower()))
-    print("starting live_cacher for pairs:", pairs)
-    publisher_loop(pairs)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.info("starting live_cacher for pairs: %s", pairs)
+    if uvloop is not None:
+        uvloop.run(publisher_loop(pairs))
+    else:
+        asyncio.run(publisher_loop(pairs))
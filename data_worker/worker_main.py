@@ -1,5 +1,4 @@
 # data_worker/worker_main.py
-import asyncio
 from data_worker.ingestion_stream import subscribe_symbols
 from dotenv import load_dotenv
 import os
@@ -10,8 +9,8 @@ def main():
     # symbols to collect - change as desired
     symbols = os.getenv("SYMBOLS", "BTCUSDT,ETHUSDT").split(",")
     symbols = [s.strip() for s in symbols if s.strip()]
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(subscribe_symbols(symbols))
+    # subscribe_symbols owns its (uvloop) event loop and blocks until stopped
+    subscribe_symbols(symbols)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
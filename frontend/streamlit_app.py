@@ -1,16 +1,19 @@
 # frontend/streamlit_app.py
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
 import threading
 import time
-import json
-import queue
+import orjson
+from collections import deque
 from datetime import datetime
 from websocket import WebSocketApp
 import plotly.graph_objects as go
 import plotly.express as px
-import io
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
 # CONFIG
 API_BASE = st.secrets.get("API_BASE", "http://127.0.0.1:8000")
@@ -19,13 +22,16 @@ DEFAULT_SYMBOL = "btcusdt"
 
 # session state initialization
 if "live_queue" not in st.session_state:
-    st.session_state.live_queue = queue.Queue()
+    # deque append/popleft are atomic in CPython: lock-free handoff from the WS thread
+    st.session_state.live_queue = deque(maxlen=1000)
 if "ws_thread_started" not in st.session_state:
     st.session_state.ws_thread_started = False
 if "live_metrics" not in st.session_state:
     st.session_state.live_metrics = {}
 if "historical_df" not in st.session_state:
     st.session_state.historical_df = None
+if "spread_view" not in st.session_state:
+    st.session_state.spread_view = None  # (historical_df, w, df_sz, csv_bytes)
 if "ws" not in st.session_state:
     st.session_state.ws = None
 
@@ -41,13 +47,28 @@ with st.sidebar:
     rolling_window = st.number_input("Rolling window (bars) for z-score", min_value=5, max_value=1000, value=60)
     fetch_hist = st.button("Load Historical Data")
 
+# Pooled HTTP session: the script re-runs top to bottom on every interaction, so a plain
+# module-level Session would be rebuilt each time; cache_resource keeps one per server process
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 # Helper: fetch historical data from backend
-def fetch_historical(symbol: str, timeframe: str, limit: int = 500):
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_historical(symbol: str, timeframe: str, limit: int):
+    # cached per (symbol, timeframe, limit) for the server's history-cache window; errors aren't cached
     url = f"{API_BASE}/api/v1/data/history/{symbol}/{timeframe}?limit={limit}"
+    r = get_http_session().get(url, timeout=8)
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+def fetch_historical(symbol: str, timeframe: str, limit: int = 500):
     try:
-        r = requests.get(url, timeout=8)
-        r.raise_for_status()
-        data = r.json()
+        data = _load_historical(symbol, timeframe, limit)
         if not data:
             return pd.DataFrame()
         df = pd.DataFrame(data)
@@ -74,13 +95,20 @@ def plot_ohlcv(df: pd.DataFrame):
     if df.empty:
         st.write("No historical OHLCV to display.")
         return None
-    fig = go.Figure(data=[go.Candlestick(x=df['ts'],
-                                         open=df['open'],
-                                         high=df['high'],
-                                         low=df['low'],
-                                         close=df['close'],
-                                         name="Price")])
-    fig.update_layout(margin=dict(l=10, r=10, t=30, b=20), height=450, showlegend=False)
+    # WebGL candles: wicks and bodies as NaN-separated line segments (one trace per
+    # direction and part) instead of an SVG Candlestick with per-candle shapes
+    up = (df['close'] >= df['open']).to_numpy()
+    fig = go.Figure()
+    for mask, color in ((up, "#3D9970"), (~up, "#FF4136")):
+        d = df[mask]
+        x = np.repeat(d['ts'].to_numpy(), 3)
+        for lo, hi, width in (('low', 'high', 1), ('open', 'close', 6)):
+            y = np.column_stack([d[lo].to_numpy(), d[hi].to_numpy(), np.full(len(d), np.nan)]).ravel()
+            fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', line=dict(color=color, width=width),
+                                       hoverinfo='skip' if lo == 'low' else 'x+y', name="Price"))
+    # uirevision keeps zoom/pan on the client across reruns
+    fig.update_layout(margin=dict(l=10, r=10, t=30, b=20), height=450, showlegend=False,
+                      uirevision="constant")
     return fig
 
 def plot_spread_zscore(df: pd.DataFrame, spread_col='spread', z_col='zscore'):
@@ -100,33 +128,64 @@ def plot_spread_zscore(df: pd.DataFrame, spread_col='spread', z_col='zscore'):
         fig.update_layout(height=350, margin=dict(l=10, r=10, t=20, b=20))
     return fig
 
+def compute_spread_z(df: pd.DataFrame, w: int) -> pd.DataFrame:
+    """ts/spread/zscore for the loaded candles."""
+    if df.empty:
+        return pd.DataFrame()
+    # if no spread column, use a naive spread from the close-close diff (placeholder)
+    spread = df['spread'] if 'spread' in df.columns else df['close'].diff().fillna(0)
+    if 'zscore' in df.columns:
+        z = df['zscore']
+    else:
+        roll = spread.rolling(w)
+        z = (spread - roll.mean()) / roll.std().replace(0, 1)
+    return pd.DataFrame({'ts': df['ts'], 'spread': spread, 'zscore': z})
+
 # Download helper
 def df_to_csv_bytes(df: pd.DataFrame):
-    buf = io.StringIO()
-    df.to_csv(buf, index=False)
-    return buf.getvalue().encode('utf-8')
+    # Arrow's C++ writer encodes straight into a byte buffer: no full-file str + .encode() pass
+    sink = pa.BufferOutputStream()
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), sink)
+    return sink.getvalue().to_pybytes()
+
+def spread_view(df_hist: pd.DataFrame, w: int):
+    """
+    (df_sz, csv_bytes) for the loaded candles, kept in session_state and rebuilt
+    only when historical_df or the rolling window changes: other reruns do no
+    hashing, join or CSV encoding.
+    """
+    view = st.session_state.spread_view
+    if view is None or view[0] is not df_hist or view[1] != w:
+        df_sz = compute_spread_z(df_hist, w)
+        csv_bytes = None
+        if not df_sz.empty:
+            df_local = df_hist.drop(columns=['spread', 'zscore'], errors='ignore').join(df_sz[['spread', 'zscore']])
+            csv_bytes = df_to_csv_bytes(df_local)
+        view = (df_hist, w, df_sz, csv_bytes)
+        st.session_state.spread_view = view
+    return view[2], view[3]
 
 # WebSocket receiver thread
-def start_ws_thread(ws_url, live_q: queue.Queue, symbol_sub=None):
+def start_ws_thread(ws_url, live_q: deque, symbol_sub=None):
     def on_message(ws, message):
         try:
-            obj = json.loads(message)
+            obj = orjson.loads(message)
             # optionally filter by symbol
             if symbol_sub and obj.get("symbol") != symbol_sub:
                 return
-            live_q.put(obj)
+            live_q.append(obj)
         except Exception as e:
             # push a small error object — handled client-side
-            live_q.put({"_error": str(e), "raw": message})
+            live_q.append({"_error": str(e), "raw": message})
 
     def on_error(ws, error):
-        live_q.put({"_error": f"ws_error: {error}"})
+        live_q.append({"_error": f"ws_error: {error}"})
 
     def on_close(ws, close_status_code, close_msg):
-        live_q.put({"_info": f"ws_closed code={close_status_code} msg={close_msg}"})
+        live_q.append({"_info": f"ws_closed code={close_status_code} msg={close_msg}"})
 
     def on_open(ws):
-        live_q.put({"_info": "ws_opened"})
+        live_q.append({"_info": "ws_opened"})
 
     # create WebSocketApp (websocket-client)
     ws_app = WebSocketApp(ws_url,
@@ -142,7 +201,7 @@ def start_ws_thread(ws_url, live_q: queue.Queue, symbol_sub=None):
             try:
                 ws_app.run_forever()
             except Exception as e:
-                live_q.put({"_error": f"run_forever_failed: {e}"})
+                live_q.append({"_error": f"run_forever_failed: {e}"})
             time.sleep(2)  # backoff before reconnect
 
     t = threading.Thread(target=run, daemon=True, name="ws_thread")
@@ -171,20 +230,15 @@ with col1:
         st.plotly_chart(fig_candle, use_container_width=True)
 
     st.markdown("### Spread & Z-score")
-    # try to compute spread & zscore locally if not provided in historical df
-    df_local = st.session_state.historical_df.copy() if st.session_state.historical_df is not None else pd.DataFrame()
-    # if no spread column, try to compute a naive spread using close-close diff (placeholder)
-    if not df_local.empty and 'spread' not in df_local.columns:
-        df_local['spread'] = df_local['close'].diff().fillna(0)
-    if not df_local.empty and 'zscore' not in df_local.columns:
-        df_local['zscore'] = (df_local['spread'] - df_local['spread'].rolling(rolling_window).mean()) / (df_local['spread'].rolling(rolling_window).std().replace(0, 1))
-    fig_spread = plot_spread_zscore(df_local, spread_col='spread', z_col='zscore')
+    # spread & zscore computed locally, once per loaded df/window; historical_df itself is never copied or mutated
+    df_hist = st.session_state.historical_df if st.session_state.historical_df is not None else pd.DataFrame()
+    df_sz, csv_bytes = spread_view(df_hist, int(rolling_window))
+    fig_spread = plot_spread_zscore(df_sz, spread_col='spread', z_col='zscore')
     if fig_spread:
         st.plotly_chart(fig_spread, use_container_width=True)
 
     # CSV download
-    if not df_local.empty:
-        csv_bytes = df_to_csv_bytes(df_local)
+    if csv_bytes is not None:
         st.download_button("Download displayed data (CSV)", data=csv_bytes, file_name=f"{symbol}_{timeframe}_data.csv", mime="text/csv")
 
 with col2:
@@ -199,10 +253,11 @@ with col2:
     # process items from live queue
     # drain queue
     processed = 0
-    while not st.session_state.live_queue.empty():
+    live_q = st.session_state.live_queue
+    while live_q:
         try:
-            obj = st.session_state.live_queue.get_nowait()
-        except queue.Empty:
+            obj = live_q.popleft()
+        except IndexError:
             break
         processed += 1
         # handle meta messages